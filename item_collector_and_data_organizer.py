@@ -1,6 +1,7 @@
 import time
 import os
 import argparse
+import csv
 import json
 import logging
 import posixpath
@@ -27,14 +28,33 @@ class WikipediaInfo(object):
             lang(str): shorthand character for language in which information 
                        need to be fetched e.g. for English = 'en'
         """
-        self.wikiObj = wikipediaapi.Wikipedia(lang)
-        self.wikiPage = self.wikiObj.page(pageName)
-        if not self.wikiPage.exists():
+        self.pageName = pageName
+        self.lang = lang
+        self.wikiObj = None
+        self.wikiPage = None
+        self.isCached = (lang, pageName) in WikipediaBatchFetcher.CACHE
+        self.cached = WikipediaBatchFetcher.CACHE.get((lang, pageName))
+        if self.isCached:
+            # Missing pages are cached as None, already logged while fetching
+            logging.info("Wikipedia info for '{}' loaded from cache!".format(
+                pageName))
+            return
+        if not self.page.exists():
             logging.error("Wikipedia page for '{}' does not exists!".format(
                 pageName))
         else:
             logging.info("Wikipedia page for '{}' successfully loaded!".format(
                 pageName))
+
+    @property
+    def page(self):
+        """
+        Wikipedia page object, built on first access
+        """
+        if self.wikiPage is None:
+            self.wikiObj = wikipediaapi.Wikipedia(self.lang)
+            self.wikiPage = self.wikiObj.page(self.pageName)
+        return self.wikiPage
     
     @property
     def summary(self): 
@@ -42,7 +62,9 @@ class WikipediaInfo(object):
         Text from summary section of Wikipedia page of city
         """
         logging.info("Fetched summary from wikipedia")
-        return self.wikiPage.summary
+        if self.isCached:
+            return self.cached["summary"] if self.cached else ""
+        return self.page.summary
     
     
     @property
@@ -51,7 +73,9 @@ class WikipediaInfo(object):
         Wikipedia page url
         """
         logging.info("Fetched wikipedia url of the city")
-        return self.wikiPage.fullurl
+        if self.isCached:
+            return self.cached["url"] if self.cached else None
+        return self.page.fullurl
     
     @property
     def sections(self):
@@ -59,7 +83,173 @@ class WikipediaInfo(object):
         Wikipedia sections of pages
         # TODO: Check if this can be used further
         """
-        return self.wikiPage.sections
+        return self.page.sections
+
+
+class WikipediaBatchFetcher(object):
+
+    """
+    Helper class to fetch summaries and urls of many wikipedia pages
+    in a single multi-title query using MediaWiki Action API
+    API Documentation:
+        https://www.mediawiki.org/wiki/API:Query
+        https://www.mediawiki.org/wiki/Extension:TextExtracts#API
+    """
+
+    # Shared enrichment cache, keyed by (lang, requested title)
+    # Pages which does not exist are cached as None
+    CACHE = {}
+    # Server url template, can be pointed to local stub of the API
+    SERVER_URL = "https://{lang}.wikipedia.org/w/api.php"
+    # TextExtracts returns at most 20 intro extracts per request
+    MAX_TITLES = 20
+    # Seconds to wait for the server before giving up on pre-fetching
+    TIMEOUT = 10
+
+    def __init__(self, lang, serverUrl=None, session=None):
+        """
+        Args:
+            lang(str): shorthand character for language in which information
+                       need to be fetched e.g. for English = 'en'
+            serverUrl(str)(optional): MediaWiki api.php url to query
+            session(requests.Session)(optional): Session to reuse connections
+        """
+        self.lang = lang
+        self.serverUrl = serverUrl or self.SERVER_URL.format(lang=lang)
+        self.session = session or requests.Session()
+
+    @classmethod
+    def clear(cls):
+        """
+        Drop every entry from the enrichment cache
+        """
+        cls.CACHE.clear()
+
+    @classmethod
+    def getParams(cls, titles):
+        """
+        Builds and returns the query parameters for the multi-title request
+        titles(list): Wikipedia page names to be fetched
+        """
+        return {
+            "action": "query",
+            "format": "json",
+            "prop": "extracts|info",
+            "exintro": 1,
+            "explaintext": 1,
+            "exlimit": cls.MAX_TITLES,
+            "inprop": "url",
+            "redirects": 1,
+            "titles": "|".join(titles),
+        }
+
+    def runQuery(self, params):
+        """
+        Run GET query and return decoded json response
+        """
+        try:
+            response = self.session.get(self.serverUrl, params=params,
+                                        timeout=self.TIMEOUT)
+            if response.status_code != 200:
+                logging.error("GET with {} failed!".format(self.serverUrl))
+                return None
+            data = response.json()
+        except (requests.RequestException, ValueError) as err:
+            logging.error("GET with {} failed: {}".format(self.serverUrl, err))
+            return None
+        logging.info("GET with {} success!".format(self.serverUrl))
+        return data
+
+    @staticmethod
+    def resolveTitles(titles, query):
+        """
+        Map requested titles to the final page titles after following
+        normalization and redirects reported by the API
+        """
+        aliases = {}
+        for item in query.get("normalized", []) + query.get("redirects", []):
+            aliases[item["from"]] = item["to"]
+        resolved = {}
+        for title in titles:
+            target = title
+            seen = set()
+            while target in aliases and target not in seen:
+                seen.add(target)
+                target = aliases[target]
+            resolved[title] = target
+        return resolved
+
+    def fetchBatch(self, titles):
+        """
+        Fetch summaries and urls of up to MAX_TITLES pages in one request,
+        following API continuation until every extract is received
+        Returns:
+            dict: page name -> {"summary": str, "url": str}, or None for
+                  pages which does not exist. Empty if the request failed
+        """
+        pages = {}
+        query = {}
+        params = self.getParams(titles)
+        while True:
+            data = self.runQuery(params)
+            if data is None:
+                return {}
+            if "error" in data:
+                logging.error("Wikipedia query failed with {}: {}".format(
+                    data["error"].get("code"), data["error"].get("info")))
+                return {}
+            batch = data.get("query", {})
+            for key in ("normalized", "redirects"):
+                query.setdefault(key, []).extend(batch.get(key, []))
+            for page in batch.get("pages", {}).values():
+                info = pages.setdefault(page["title"], {})
+                info.update({key: val for key, val in page.items()
+                             if val is not None})
+            if "continue" not in data:
+                break
+            params = dict(self.getParams(titles), **data["continue"])
+
+        result = {}
+        for title, target in self.resolveTitles(titles, query).items():
+            page = pages.get(target)
+            if page is None or "missing" in page or "invalid" in page:
+                logging.error("Wikipedia page for '{}' does not exists!".format(
+                    title))
+                result[title] = None
+                continue
+            result[title] = {
+                "summary": page.get("extract", ""),
+                "url": page.get("fullurl"),
+            }
+        return result
+
+    def fetch(self, titles):
+        """
+        Fetch summaries and urls of the given pages, skipping the ones
+        already cached, and fill the enrichment cache in bulk
+        Args:
+            titles(list): Wikipedia page names to be fetched
+        Returns:
+            dict: page name -> {"summary": str, "url": str}, or None for
+                  pages which does not exist
+        """
+        pending = []
+        for title in titles:
+            if "|" in title:
+                # Would split the multi-value titles parameter
+                logging.warning("Skipping pre-fetch of invalid title '{}'"
+                                .format(title))
+                continue
+            if (self.lang, title) not in self.CACHE and title not in pending:
+                pending.append(title)
+        for start in range(0, len(pending), self.MAX_TITLES):
+            batch = self.fetchBatch(pending[start:start + self.MAX_TITLES])
+            for title, info in batch.items():
+                self.CACHE[(self.lang, title)] = info
+            logging.info("Fetched {} wikipedia summaries in one request".format(
+                len([info for info in batch.values() if info])))
+        return {title: self.CACHE[(self.lang, title)] for title in titles
+                if (self.lang, title) in self.CACHE}
 
  
 class GeoLocator(object):
@@ -229,6 +419,23 @@ geoObj = None
 otMapObj = None
 wikiUrl = None
 
+def prewarmWikipediaCache(language='en', cities=None):
+    """
+    Fetch wikipedia summaries of all the cities in bulk, so that later
+    item collection for any of them is served from the cache
+    Args:
+        language(str): shorthand character for language in which information
+                       need to be fetched e.g. for English = 'en'
+        cities(list)(optional): City names, defaults to the whole catalogue
+                                listed in city_ranking.csv
+    """
+    if cities is None:
+        with open(os.path.join(os.getcwd(), "city_ranking.csv"), "r") as f:
+            cities = [row["city"] for row in csv.DictReader(f)]
+    logging.info("***** Pre-fetching summaries of {} cities from Wikipedia"
+                 .format(len(cities)))
+    return WikipediaBatchFetcher(language).fetch(cities)
+
 def setupInfoFetchObjects(cityName, language):
     
     global wikiInfoObj
@@ -346,6 +553,7 @@ def main():
     
     cityData = {}
     
+    prewarmWikipediaCache(language, cities)
       
     for city in cities:
         setupInfoFetchObjects(city, language)
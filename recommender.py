@@ -6,7 +6,7 @@ import pandas as pd
 import numpy as np
 import time
 from sklearn.metrics.pairwise import cosine_similarity
-from item_collector_and_data_organizer import fetchInfo
+from item_collector_and_data_organizer import fetchInfo, prewarmWikipediaCache
 
 import hashlib
 
@@ -81,6 +81,13 @@ def find_similarity(column, user, number, scores, city):
     # message = f'Based on your aggregate preferences and ratings, {city_similar} is the top recommended city to move/travel to.'
     return city_similar
 
+# Fetch wikipedia summaries of every city once per server process
+
+
+@st.cache
+def prewarm(cities):
+    prewarmWikipediaCache('en', cities)
+
 # Get more info about the recommended city
 
 
@@ -160,6 +167,7 @@ def main():
     st.markdown(html_temp, unsafe_allow_html=True)
 
     df, data,scores, location = load()
+    prewarm(df['city'].tolist())
     available_preferences = {
         "Employment Score": "Employability",
         "Startup Score": "Startups",
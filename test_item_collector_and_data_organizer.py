@@ -0,0 +1,195 @@
+import unittest
+from unittest import mock
+
+import requests
+
+import item_collector_and_data_organizer as collector
+from item_collector_and_data_organizer import WikipediaBatchFetcher, WikipediaInfo
+
+
+class StubResponse(object):
+
+    """
+    Minimal stand-in for requests.Response
+    """
+
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        if isinstance(self.payload, Exception):
+            raise self.payload
+        return self.payload
+
+
+class StubMediaWikiSession(object):
+
+    """
+    Local stub of the MediaWiki Action API query module
+    Args:
+        missing(set): titles of pages which does not exist
+        split(bool): return extracts over two continued responses
+    """
+
+    NORMALIZED = {"new york": "New york"}
+    REDIRECTS = {"New york": "New York City"}
+
+    def __init__(self, missing=(), split=False):
+        self.missing = set(missing)
+        self.split = split
+        self.calls = []
+
+    def resolve(self, title):
+        title = self.NORMALIZED.get(title, title)
+        return self.REDIRECTS.get(title, title)
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(dict(params))
+        titles = params["titles"].split("|")
+        firstPart = self.split and "excontinue" not in params
+        query = {
+            "normalized": [{"from": t, "to": self.NORMALIZED[t]}
+                           for t in titles if t in self.NORMALIZED],
+            "redirects": [{"from": self.NORMALIZED.get(t, t),
+                           "to": self.resolve(t)}
+                          for t in titles
+                          if self.NORMALIZED.get(t, t) in self.REDIRECTS],
+            "pages": {},
+        }
+        for index, title in enumerate(titles):
+            title = self.resolve(title)
+            page = {"title": title}
+            if title in self.missing:
+                page["missing"] = ""
+            else:
+                page["fullurl"] = "https://en.wikipedia.org/wiki/" + title
+                # Only odd pages carry their extract in the continued part
+                if not (firstPart and index % 2):
+                    page["extract"] = "About " + title
+            query["pages"][str(-index - 1)] = page
+        payload = {"query": query}
+        if firstPart and len(titles) > 1:
+            payload["continue"] = {"excontinue": "1", "continue": "||"}
+        return StubResponse(payload)
+
+
+class WikipediaBatchFetcherTest(unittest.TestCase):
+
+    def setUp(self):
+        WikipediaBatchFetcher.clear()
+        self.addCleanup(WikipediaBatchFetcher.clear)
+
+    def fetcher(self, session):
+        return WikipediaBatchFetcher("en", serverUrl="http://stub/api.php",
+                                     session=session)
+
+    def test_resolves_normalization_and_redirects(self):
+        session = StubMediaWikiSession()
+        result = self.fetcher(session).fetch(["new york", "Paris"])
+        self.assertEqual(result["new york"], {
+            "summary": "About New York City",
+            "url": "https://en.wikipedia.org/wiki/New York City"})
+        self.assertEqual(result["Paris"]["summary"], "About Paris")
+        self.assertEqual(len(session.calls), 1)
+
+    def test_merges_continued_responses(self):
+        session = StubMediaWikiSession(split=True)
+        result = self.fetcher(session).fetch(["Paris", "Berlin", "Rome"])
+        self.assertEqual(len(session.calls), 2)
+        self.assertEqual(session.calls[1]["excontinue"], "1")
+        for city in ("Paris", "Berlin", "Rome"):
+            self.assertEqual(result[city]["summary"], "About " + city)
+            self.assertTrue(result[city]["url"].endswith(city))
+
+    def test_missing_pages_are_cached_as_absent(self):
+        session = StubMediaWikiSession(missing={"Atlantis"})
+        fetcher = self.fetcher(session)
+        result = fetcher.fetch(["Atlantis", "Paris"])
+        self.assertIsNone(result["Atlantis"])
+        self.assertIsNone(WikipediaBatchFetcher.CACHE[("en", "Atlantis")])
+        fetcher.fetch(["Atlantis"])
+        self.assertEqual(len(session.calls), 1)
+
+    def test_chunks_titles_per_request(self):
+        session = StubMediaWikiSession()
+        titles = ["City {}".format(i) for i in range(45)]
+        result = self.fetcher(session).fetch(titles)
+        self.assertEqual(len(result), 45)
+        self.assertEqual(
+            [len(call["titles"].split("|")) for call in session.calls],
+            [20, 20, 5])
+
+    def test_cached_titles_are_not_requested_again(self):
+        session = StubMediaWikiSession()
+        fetcher = self.fetcher(session)
+        fetcher.fetch(["Paris"])
+        fetcher.fetch(["Paris", "Berlin"])
+        self.assertEqual([call["titles"] for call in session.calls],
+                         ["Paris", "Berlin"])
+
+    def test_titles_with_separator_are_skipped(self):
+        session = StubMediaWikiSession()
+        result = self.fetcher(session).fetch(["Paris|Berlin"])
+        self.assertEqual(result, {})
+        self.assertEqual(session.calls, [])
+
+    def test_api_error_is_not_reported_as_missing_pages(self):
+        session = mock.Mock()
+        session.get.return_value = StubResponse(
+            {"error": {"code": "maxlag", "info": "Waiting for a server"}})
+        with self.assertLogs(level="ERROR") as logs:
+            result = self.fetcher(session).fetch(["Paris"])
+        self.assertEqual(result, {})
+        self.assertEqual(WikipediaBatchFetcher.CACHE, {})
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("maxlag", logs.output[0])
+
+    def test_request_failures_are_logged_and_ignored(self):
+        session = mock.Mock()
+        session.get.side_effect = requests.ConnectionError("no route")
+        self.assertEqual(self.fetcher(session).fetch(["Paris"]), {})
+        session.get.side_effect = None
+        session.get.return_value = StubResponse(ValueError("not json"))
+        self.assertEqual(self.fetcher(session).fetch(["Paris"]), {})
+        self.assertEqual(WikipediaBatchFetcher.CACHE, {})
+
+
+class WikipediaInfoCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        WikipediaBatchFetcher.clear()
+        self.addCleanup(WikipediaBatchFetcher.clear)
+        WikipediaBatchFetcher("en", serverUrl="http://stub/api.php",
+                              session=StubMediaWikiSession(
+                                  missing={"Atlantis"})).fetch(
+                                      ["Paris", "Atlantis"])
+
+    def test_reads_cache_without_wikipedia_client(self):
+        with mock.patch.object(collector.wikipediaapi, "Wikipedia",
+                               create=True) as client:
+            info = WikipediaInfo("Paris", "en")
+            self.assertEqual(info.summary, "About Paris")
+            self.assertEqual(info.url, "https://en.wikipedia.org/wiki/Paris")
+            client.assert_not_called()
+
+    def test_missing_page_from_cache(self):
+        with mock.patch.object(collector.wikipediaapi, "Wikipedia",
+                               create=True) as client:
+            info = WikipediaInfo("Atlantis", "en")
+            self.assertEqual(info.summary, "")
+            self.assertIsNone(info.url)
+            client.assert_not_called()
+
+    def test_sections_builds_page_on_demand(self):
+        with mock.patch.object(collector.wikipediaapi, "Wikipedia",
+                               create=True) as client:
+            info = WikipediaInfo("Paris", "en")
+            sections = info.sections
+            client.assert_called_once_with("en")
+            client.return_value.page.assert_called_once_with("Paris")
+            self.assertIs(sections, client.return_value.page.return_value.sections)
+
+
+if __name__ == "__main__":
+    unittest.main()